@@ -2,24 +2,61 @@
 
 import logging
 from datetime import timedelta
+from typing import Any, Dict, Optional, Set, Tuple
 
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
 from homeassistant.const import CONF_SCAN_INTERVAL
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
 
 # Importe as constantes definidas na sua integração
-from .const import DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, DEFAULT_SCAN_INTERVAL_SECONDS
+from .const import DOMAIN, CONF_HOST, CONF_USERNAME, CONF_PASSWORD, DEFAULT_SCAN_INTERVAL_SECONDS, CONF_CAPTURE_RAW, CONF_USAGE_CYCLES, DEFAULT_USAGE_CYCLES, SERVICE_PROFILE, ATTR_POLLS, DEFAULT_PROFILE_POLLS, ATTR_TIMEOUT, DEFAULT_PROFILE_TIMEOUT_SECONDS, MIN_PROFILE_TIMEOUT_SECONDS, CONF_WAN_STATS_PATH, CONF_WAN_STATS_INTERVAL, DEFAULT_WAN_STATS_INTERVAL
 # Importe o seu cliente de API personalizado
 from .api_client import RouterApiClient
+from .capture import RawResponseRecorder
+from .client_registry import async_get_shared_client, async_release_shared_client, async_get_live_stream
+from .usage import UsageAccumulator
+from .profiler import PollProfiler, DATA_PROFILER
+from .live import websocket_live_throughput
+from .backfill import async_backfill_gap
 
 _LOGGER = logging.getLogger(__name__)
 
 # Define as plataformas que a sua integração oferece (neste caso, apenas sensores)
 PLATFORMS = ["sensor"]
 
+# A integração só é configurada através da interface (config flow)
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_POLLS, default=DEFAULT_PROFILE_POLLS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(ATTR_TIMEOUT, default=DEFAULT_PROFILE_TIMEOUT_SECONDS): vol.All(vol.Coerce(float), vol.Range(min=MIN_PROFILE_TIMEOUT_SECONDS)),
+})
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Regista os serviços da integração."""
+    # Um único perfilador para todas as entradas (cProfile só admite um ativo de cada vez)
+    profiler = hass.data[DATA_PROFILER] = PollProfiler()
+
+    async def async_handle_profile(call: ServiceCall) -> None:
+        """Perfila as próximas N leituras e grava os resultados na pasta de configuração."""
+        output_prefix = hass.config.path(f"{DOMAIN}_profile_{dt_util.now():%Y%m%d_%H%M%S}")
+        if not profiler.start(hass, call.data[ATTR_POLLS], output_prefix, call.data[ATTR_TIMEOUT]):
+            raise HomeAssistantError(f"Já há um perfil em curso ({profiler.remaining} leituras em falta)")
+
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, async_handle_profile, schema=PROFILE_SCHEMA)
+
+    # Comando websocket para os cartões de tráfego em tempo real
+    websocket_api.async_register_command(hass, websocket_live_throughput)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Configura o sensor de tráfego do router a partir de uma entrada de configuração."""
     _LOGGER.debug("A configurar a entrada de configuração para %s", entry.entry_id)
@@ -33,24 +70,46 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Nota: CONF_SCAN_INTERVAL vem do Home Assistant core, DEFAULT_SCAN_INTERVAL_SECONDS vem do seu const.py
     scan_interval = entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL_SECONDS)
     
-    # Obtém uma sessão HTTP assíncrona do Home Assistant
-    session = async_get_clientsession(hass)
-    # Inicializa o seu cliente de API personalizado
-    api_client = RouterApiClient(host, username, password, session)
+    # Captura opcional das respostas brutas do router para a pasta de configuração
+    recorder = None
+    if entry.options.get(CONF_CAPTURE_RAW, False):
+        recorder = RawResponseRecorder(hass.config.path(f"{DOMAIN}_{entry.entry_id}_capture.jsonl.gz"))
+        _LOGGER.info("A capturar respostas brutas do router para %s", recorder.path)
+
+    # Obtém o cliente de API partilhado por todas as entradas com o mesmo router e credenciais
+    api_client = async_get_shared_client(hass, host, username, password, recorder)
+
+    # Acumuladores de consumo por hora/dia/mês, restaurados do disco com os contadores da última leitura,
+    # para a primeira leitura após um reinício medir o gap
+    usage = UsageAccumulator(hass, entry.entry_id, entry.options.get(CONF_USAGE_CYCLES, DEFAULT_USAGE_CYCLES), api_client)
+    await usage.async_load()
 
     # Cria e inicializa o coordenador de atualização de dados
     coordinator = RouterTrafficSensorCoordinator(
         hass,
         entry,          # Passa a entrada de configuração diretamente para o coordenador
         api_client,
-        scan_interval
+        scan_interval,
+        usage,
+        hass.data[DATA_PROFILER],
+        recorder,
     )
     
+    # Endpoint opcional de estatísticas WAN, lido com a mesma sessão que as estatísticas LAN
+    wan_path = entry.options.get(CONF_WAN_STATS_PATH, "").strip()
+    if wan_path:
+        # Entradas do mesmo router com o mesmo caminho partilham uma só leitura
+        coordinator.wan_endpoint = api_client.register_endpoint(entry.entry_id, wan_path, entry.options.get(CONF_WAN_STATS_INTERVAL, DEFAULT_WAN_STATS_INTERVAL))
+
     # Realiza a primeira atualização de dados para verificar a conectividade e carregar dados iniciais
     try:
         await coordinator.async_config_entry_first_refresh()
     except Exception as e:
         _LOGGER.error("Falha ao conectar ao router em %s: %s", host, e)
+        if coordinator.wan_endpoint:
+            api_client.unregister_endpoint(entry.entry_id, coordinator.wan_endpoint)
+        api_client.unregister_poll_interval(entry.entry_id)
+        await async_release_shared_client(hass, api_client, recorder)
         # Se a primeira atualização falhar, a integração não deve ser configurada
         raise ConfigEntryNotReady(f"Falha ao conectar ou autenticar com o router: {e}") from e
 
@@ -73,7 +132,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         # Remove o coordenador dos dados do Home Assistant
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        # Termina as subscrições desta entrada no stream em tempo real do router
+        coordinator.live.async_end_subscriptions(entry.entry_id)
+        # Deixa de ler o endpoint WAN desta entrada no cliente partilhado
+        if coordinator.wan_endpoint:
+            coordinator.api_client.unregister_endpoint(entry.entry_id, coordinator.wan_endpoint)
+        # O intervalo desta entrada deixa de contar para a deteção de gaps no cliente partilhado
+        coordinator.api_client.unregister_poll_interval(entry.entry_id)
+        # Liberta o cliente partilhado, desligando e gravando a captura desta entrada
+        await async_release_shared_client(hass, coordinator.api_client, coordinator.recorder)
+        # Grava já o consumo acumulado e os contadores do cliente, para a próxima configuração os ler atualizados
+        await coordinator.usage.async_save()
         # Se não houver mais entradas para este domínio, remove o domínio do hass.data
         if not hass.data[DOMAIN]: 
             hass.data.pop(DOMAIN)
@@ -89,9 +159,23 @@ async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
 class RouterTrafficSensorCoordinator(DataUpdateCoordinator):
     """Coordenador de atualização de dados para o sensor de tráfego do router."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, api_client: RouterApiClient, update_interval_seconds: int):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, api_client: RouterApiClient, update_interval_seconds: int, usage: UsageAccumulator, profiler: PollProfiler, recorder: Optional[RawResponseRecorder] = None):
         """Inicializa o coordenador."""
         self.api_client = api_client
+        self.recorder = recorder # Captura desta entrada, ligada ao cliente partilhado até ao unload
+        self.usage = usage
+        self.profiler = profiler
+        # Stream por websocket do cliente partilhado (um por router), com leitura rápida só enquanto houver subscritores
+        self.live = async_get_live_stream(hass, api_client)
+        # Nome do endpoint WAN desta entrada no cliente (None = não configurado)
+        self.wan_endpoint: Optional[str] = None
+        # Interfaces/totais cujos contadores mudaram na última leitura (None = notificar todas as entidades)
+        self._changed: Optional[Set[Tuple[str, str]]] = None
+        self._notified_success = True
+        # O cliente usa o intervalo para detetar leituras em falta (gaps)
+        api_client.register_poll_interval(entry.entry_id, update_interval_seconds)
+        # Com um perfil ativo o parsing corre no event loop, onde o cProfile o vê
+        api_client.set_offload_veto(lambda: profiler.active)
         self.config_entry = entry # Armazena a entrada de configuração para acesso posterior (ex: opções)
         
         super().__init__(
@@ -104,13 +188,94 @@ class RouterTrafficSensorCoordinator(DataUpdateCoordinator):
 
     async def _async_update_data(self):
         """Busca dados da API do router. Este é o método chamado pelo coordenador."""
+        # Sem perfil ativo não há qualquer custo adicional além desta verificação
+        if not self.profiler.active:
+            return await self._async_fetch_data()
+        self.profiler.enable()
+        try:
+            return await self._async_fetch_data()
+        finally:
+            self.profiler.disable()
+            # Conta também as leituras falhadas, que não chegam a notificar as entidades
+            self.profiler.poll_done()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notifica as entidades, perfilando a escrita dos estados quando há um perfil ativo."""
+        if not self.profiler.active:
+            self._async_dispatch_changes()
+            return
+        self.profiler.enable()
+        try:
+            self._async_dispatch_changes()
+        finally:
+            self.profiler.disable()
+
+    @callback
+    def _async_dispatch_changes(self) -> None:
+        """
+        Notifica só as entidades cujo contexto (grupo, chave) está no conjunto de alterações.
+
+        Todas as entidades são notificadas quando não há conjunto de alterações
+        (falha, primeira leitura, atualização fora do ciclo normal) ou quando a
+        disponibilidade muda, para que o estado "indisponível" seja sempre escrito.
+        """
+        changed, self._changed = self._changed, None
+        notify_all = changed is None or not self.last_update_success or not self._notified_success
+        self._notified_success = self.last_update_success
+        if notify_all:
+            super().async_update_listeners()
+            return
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
+
+    def _compute_changes(self, data: Dict[str, Any]) -> Optional[Set[Tuple[str, str]]]:
+        """Devolve as interfaces e totais cujos contadores ou velocidades mudaram desde a última leitura."""
+        if not self.data or self.data.get("gap") or data.get("gap"):
+            return None # Os atributos de gap dos sensores de velocidade são escritos e limpos em todas as entidades
+        previous_interfaces = self.data.get("interfaces", {})
+        current_interfaces = data.get("interfaces", {})
+        if previous_interfaces.keys() != current_interfaces.keys():
+            return None # Interfaces surgiram ou desapareceram: notifica todas as entidades
+        changed: Set[Tuple[str, str]] = set()
+        for interface, values in current_interfaces.items():
+            previous = previous_interfaces[interface]
+            if (
+                previous["raw"] == values["raw"]
+                and previous["download"] == values["download"]
+                and previous["upload"] == values["upload"]
+            ):
+                continue # Porta parada: nenhuma entidade desta interface precisa de escrever estado
+            changed.add(("interfaces", interface))
+            changed.add(("totals", "wifi" if interface.startswith("wl") else "ethernet"))
+            changed.add(("totals", "global"))
+        # Um endpoint extra só tem dados novos quando foi lido nesta atualização
+        previous_endpoints = self.data.get("endpoints", {})
+        for name, endpoint_data in data.get("endpoints", {}).items():
+            if endpoint_data is not previous_endpoints.get(name):
+                changed.add(("endpoints", name))
+        return changed
+
+    async def _async_fetch_data(self):
+        """Lê as estatísticas do router e atualiza o consumo acumulado."""
         try:
             _LOGGER.debug("A buscar dados do router via coordenador...")
             # Realiza a chamada à API usando o cliente
             data = await self.api_client.async_get_stats()
+            # Atualiza o consumo acumulado com o tráfego desde a última leitura
+            rolled_over = self.usage.update(data, dt_util.now())
+            # No início de um novo período todos os sensores de consumo voltam a zero
+            self._changed = None if rolled_over else self._compute_changes(data)
+            # Depois de um gap, preenche as horas em falta nas estatísticas de longo prazo
+            if data.get("gap"):
+                self.hass.async_create_task(
+                    async_backfill_gap(self.hass, self.config_entry.entry_id, data, dict(self.usage.last_deltas), self.usage.cycles)
+                )
             _LOGGER.debug("Dados buscados com sucesso. Interfaces encontradas: %s", list(data.get("interfaces", {}).keys()))
             return data
         except Exception as err:
+            self._changed = None
             _LOGGER.error("Erro na comunicação com o router: %s", err)
             # Lança UpdateFailed para sinalizar ao Home Assistant que a atualização falhou
             raise UpdateFailed(f"Erro na comunicação com o router: {err}")
\ No newline at end of file
@@ -1,28 +1,62 @@
 # custom_components/router_traffic_sensor/api_client.py
 
+import asyncio
 import logging
 import base64
+import json
 import re
+import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 import aiohttp
 from bs4 import BeautifulSoup
 
 # --- ADICIONE ESTAS DUAS LINHAS ---
-from .const import API_RX_BYTES_IDX, API_TX_BYTES_IDX 
+from .const import API_RX_BYTES_IDX, API_TX_BYTES_IDX, STATS_ENDPOINTS, STATS_ENDPOINT_LAN, SHARED_POLL_WINDOW_SECONDS, OFFLOAD_THRESHOLD_BYTES, GAP_FACTOR
+from .capture import RawResponseRecorder
 # Certifique-se de que DOMAIN, CONF_HOST, etc., se forem usados aqui, também são importados de const.py
 # --- FIM DA ADIÇÃO ---
 
 _LOGGER = logging.getLogger(__name__)
 
+COUNTER_WRAP = 2**32 # Router byte counters are 32-bit
+
+
+def counter_delta(current: int, previous: int) -> int:
+    """Return how much a router byte counter grew, accounting for a 32-bit wrap."""
+    if current < previous:
+        return (COUNTER_WRAP - previous) + current
+    return current - previous
+
+
+def traffic_counters(raw: List[int]) -> Tuple[int, int]:
+    """
+    Return the (download, upload) byte counters of a parsed stats row.
+
+    Download is what the router sent (Tx) and upload what it received (Rx),
+    the convention of the speed, usage and live throughput figures.
+    """
+    download = raw[API_TX_BYTES_IDX] if len(raw) > API_TX_BYTES_IDX else 0
+    upload = raw[API_RX_BYTES_IDX] if len(raw) > API_RX_BYTES_IDX else 0
+    return download, upload
+
 # --- Mantém o restante da classe RouterApiClient igual até aqui ---
 
 class RouterApiClient:
     """Client for router API."""
 
-    def __init__(self, host: str, username: str, password: str, session: aiohttp.ClientSession):
-        """Initialize the client."""
+    def __init__(self, host: str, username: str, password: str, session: aiohttp.ClientSession, recorder: Optional[RawResponseRecorder] = None,
+                 offload_threshold: Optional[int] = OFFLOAD_THRESHOLD_BYTES, executor: Optional[Executor] = None):
+        """
+        Initialize the client.
+
+        LAN stats payloads of offload_threshold bytes or more are parsed in
+        the given executor (the loop's default thread pool when None; a
+        process pool also works) instead of on the event loop. An
+        offload_threshold of None always parses inline.
+        """
         self._host = host
         self._username = username
         self._password = password
@@ -30,6 +64,101 @@ class RouterApiClient:
         self._session_id: Optional[str] = None
         self._previous_stats: Dict[str, Any] = {} # Para guardar o estado anterior do tráfego
         self._last_update_time: Optional[datetime] = None
+        # Opt-in capture of raw responses (see capture.py), one recorder per user of a shared client
+        self._recorders: List[RawResponseRecorder] = [recorder] if recorder else []
+        self._offload_threshold = offload_threshold
+        self._executor = executor
+        self._offload_veto: Optional[Callable[[], bool]] = None
+        self._poll_intervals: Dict[str, float] = {} # Poll interval of each user of the client
+        self._gap_threshold: Optional[float] = None # Seconds between samples above which a poll was missed
+        # Stats endpoints read with the same SESSIONID: name -> {"path", "interval"}
+        self._endpoints: Dict[str, Dict[str, Any]] = {name: dict(endpoint) for name, endpoint in STATS_ENDPOINTS.items()}
+        self._endpoint_data: Dict[str, Any] = {} # Latest processed stats of each extra endpoint
+        self._endpoint_previous: Dict[str, Dict[str, Any]] = {} # Previous rows of each extra endpoint
+        self._endpoint_last_fetch: Dict[str, datetime] = {}
+        # One fetch per tick is shared by every caller of async_get_stats
+        self._inflight: Optional[asyncio.Task] = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_monotonic = 0.0
+
+    def register_poll_interval(self, owner: str, interval_seconds: float) -> None:
+        """
+        Tell the client how often owner polls it, to detect missed polls.
+
+        A sample taken more than GAP_FACTOR times the shortest registered
+        interval after the previous one is flagged as post-gap. Without a
+        registered interval no gaps are detected. Registering again for the
+        same owner replaces its interval.
+        """
+        self._poll_intervals[owner] = interval_seconds
+        self._update_gap_threshold()
+
+    def unregister_poll_interval(self, owner: str) -> None:
+        """Forget owner's poll interval (owner stopped polling)."""
+        self._poll_intervals.pop(owner, None)
+        self._update_gap_threshold()
+
+    def _update_gap_threshold(self) -> None:
+        if self._poll_intervals:
+            self._gap_threshold = min(self._poll_intervals.values()) * GAP_FACTOR
+        else:
+            self._gap_threshold = None
+
+    def set_offload_veto(self, veto: Optional[Callable[[], bool]]) -> None:
+        """
+        Parse inline, whatever the payload size, while veto() returns True.
+
+        Used while profiling: cProfile only sees the event loop thread, so
+        parsing done in the executor would be missing from the profile.
+        """
+        self._offload_veto = veto
+
+    def export_state(self) -> Optional[Dict[str, Any]]:
+        """Return the previous-poll counters, to be persisted across restarts."""
+        if self._last_update_time is None:
+            return None
+        return {"time": self._last_update_time.isoformat(), "previous_stats": self._previous_stats}
+
+    def restore_state(self, state: Optional[Dict[str, Any]]) -> None:
+        """Restore persisted counters, unless this client has already polled."""
+        if not state or self._last_update_time is not None:
+            return
+        self._previous_stats = state["previous_stats"]
+        self._last_update_time = datetime.fromisoformat(state["time"])
+        _LOGGER.debug("Restored counters from %s", state["time"])
+
+    def register_endpoint(self, owner: str, path: str, interval: float = 0) -> str:
+        """
+        Register an extra stats endpoint (e.g. WAN stats) for owner and return its name.
+
+        The endpoint must answer with the same {"stats": "<tr>...</tr>"}
+        table as the LAN statistics. interval is the minimum number of seconds
+        between reads of this endpoint; 0 reads it on every poll. Its latest
+        processed stats ({"interfaces", "totals"}, speeds averaged since its
+        previous read) are returned under "endpoints"[name] by async_get_stats.
+        Endpoints are named by their path, so owners sharing the client and
+        registering the same path share one read, at the shortest interval
+        any of them asked for.
+        """
+        name = path
+        endpoint = self._endpoints.setdefault(name, {"path": path, "interval": interval, "users": {}})
+        endpoint["users"][owner] = interval
+        endpoint["interval"] = min(endpoint["users"].values())
+        return name
+
+    def unregister_endpoint(self, owner: str, name: str) -> None:
+        """Release owner's use of an extra stats endpoint; the last owner stops its reads and drops its data."""
+        endpoint = self._endpoints.get(name)
+        if name == STATS_ENDPOINT_LAN or endpoint is None:
+            return
+        endpoint["users"].pop(owner, None)
+        if endpoint["users"]:
+            endpoint["interval"] = min(endpoint["users"].values())
+            return
+        self._endpoints.pop(name)
+        self._endpoint_data.pop(name, None)
+        self._endpoint_previous.pop(name, None)
+        self._endpoint_last_fetch.pop(name, None)
 
     async def _authenticate(self) -> None:
         """Perform authentication and get SESSIONID."""
@@ -63,25 +192,44 @@ class RouterApiClient:
             else:
                 raise ValueError("Failed to extract SESSIONID from cookie string.")
 
-    async def _get_raw_stats(self) -> Dict[str, Any]:
-        """Fetch raw statistics from the router."""
+    async def _get_bytes(self, path: str) -> bytes:
+        """Fetch an endpoint from the router with the current SESSIONID, as the raw response body."""
         if not self._session_id:
             await self._authenticate()
 
         headers = {
             "Cookie": self._session_id
         }
-        stats_url = f"http://{self._host}/ss-json/fgw.lanstatistics.json"
+        stats_url = f"http://{self._host}{path}"
 
         _LOGGER.debug("Fetching stats from %s with Cookie: %s", stats_url, self._session_id)
         async with self._session.get(stats_url, headers=headers, timeout=10) as response:
             response.raise_for_status()
-            data = await response.json()
-            if "stats" not in data or not isinstance(data["stats"], str):
-                raise ValueError("Unexpected API response format: 'stats' field missing or not a string.")
-            return data
-
-    def _parse_html_table(self, html_content: str) -> List[Dict[str, Any]]:
+            return await response.read()
+
+    async def _get_raw_stats(self) -> bytes:
+        """Fetch the raw statistics payload from the router (decoded by process_stats_payload)."""
+        return await self._get_bytes(self._endpoints[STATS_ENDPOINT_LAN]["path"])
+
+    def _due_endpoints(self, now: datetime) -> List[str]:
+        """Return the endpoints to read in this poll (LAN stats are always due)."""
+        due = []
+        for name, endpoint in self._endpoints.items():
+            last_fetch = self._endpoint_last_fetch.get(name)
+            if name == STATS_ENDPOINT_LAN or last_fetch is None or (now - last_fetch).total_seconds() >= endpoint["interval"]:
+                due.append(name)
+        return due
+
+    async def _fetch_endpoints(self, names: List[str]) -> Dict[str, Any]:
+        """Fetch the given endpoints concurrently as raw bytes; failures are returned as exceptions."""
+        results = await asyncio.gather(
+            *(self._get_bytes(self._endpoints[name]["path"]) for name in names),
+            return_exceptions=True,
+        )
+        return dict(zip(names, results))
+
+    @staticmethod
+    def _parse_html_table(html_content: str) -> List[Dict[str, Any]]:
         """Parse the HTML table from the 'stats' field."""
         soup = BeautifulSoup(f"<table>{html_content}</table>", "html.parser")
         result = []
@@ -107,9 +255,14 @@ class RouterApiClient:
         _LOGGER.debug("Parsed HTML table: %s", result)
         return result
 
-    def _calculate_and_categorize_stats(self, current_parsed_stats: List[Dict[str, Any]], elapsed_seconds: float) -> Dict[str, Any]:
+    @staticmethod
+    def _calculate_and_categorize_stats(current_parsed_stats: List[Dict[str, Any]], previous_stats: Dict[str, Any], elapsed_seconds: float, after_gap: bool = False) -> Dict[str, Any]:
         """
         Calculate speeds and categorize stats (per interface, wifi, ethernet, global).
+        previous_stats maps interface names to the rows parsed in the previous poll.
+        after_gap marks a sample taken after missed polls: its speeds are the
+        average over the whole gap, and a counter that went down is taken as
+        reset (router reboot) rather than wrapped.
         Returns a dictionary like:
         {
             "interfaces": { "eth0": {"download": X, "upload": Y, "raw": [...]}, ... },
@@ -138,7 +291,7 @@ class RouterApiClient:
 
         for curr_row in current_parsed_stats:
             interface = curr_row["interface"]
-            prev_row = self._previous_stats.get(interface)
+            prev_row = previous_stats.get(interface)
             
             is_wifi = interface.startswith("wl") # Assumes Wi-Fi interfaces start with 'wl'
             
@@ -148,24 +301,25 @@ class RouterApiClient:
 
             # Only calculate speed if previous data exists and elapsed time is valid
             if prev_row and elapsed_seconds > 0:
-                current_rx_bytes = curr_row["data"][API_RX_BYTES_IDX] if len(curr_row["data"]) > API_RX_BYTES_IDX else 0
-                previous_rx_bytes = prev_row["data"][API_RX_BYTES_IDX] if len(prev_row["data"]) > API_RX_BYTES_IDX else 0
-
-                current_tx_bytes = curr_row["data"][API_TX_BYTES_IDX] if len(curr_row["data"]) > API_TX_BYTES_IDX else 0
-                previous_tx_bytes = prev_row["data"][API_TX_BYTES_IDX] if len(prev_row["data"]) > API_TX_BYTES_IDX else 0
-                
-                download_diff = current_rx_bytes - previous_rx_bytes
-                if download_diff < 0: # Counter wrapped
-                    download_diff = (2**32 - previous_rx_bytes) + current_rx_bytes
-                    _LOGGER.warning("Rx Bytes counter for %s wrapped. Diff: %s", interface, download_diff)
-
-                upload_diff = current_tx_bytes - previous_tx_bytes
-                if upload_diff < 0: # Counter wrapped
-                    upload_diff = (2**32 - previous_tx_bytes) + current_tx_bytes
-                    _LOGGER.warning("Tx Bytes counter for %s wrapped. Diff: %s", interface, upload_diff)
-                
-                download_speed = ((upload_diff / (1024*1024)) / elapsed_seconds)   # Convert bytes to MB/s
-                upload_speed = ((download_diff / (1024*1024)) / elapsed_seconds)  # Convert bytes to MB/s
+                current_download_bytes, current_upload_bytes = traffic_counters(curr_row["data"])
+                previous_download_bytes, previous_upload_bytes = traffic_counters(prev_row["data"])
+
+                download_diff = counter_delta(current_download_bytes, previous_download_bytes)
+                if current_download_bytes < previous_download_bytes and after_gap: # Counter reset during the gap
+                    download_diff = current_download_bytes
+                    _LOGGER.info("Tx Bytes counter for %s reset during a gap", interface)
+                elif current_download_bytes < previous_download_bytes: # Counter wrapped
+                    _LOGGER.warning("Tx Bytes counter for %s wrapped. Diff: %s", interface, download_diff)
+
+                upload_diff = counter_delta(current_upload_bytes, previous_upload_bytes)
+                if current_upload_bytes < previous_upload_bytes and after_gap: # Counter reset during the gap
+                    upload_diff = current_upload_bytes
+                    _LOGGER.info("Rx Bytes counter for %s reset during a gap", interface)
+                elif current_upload_bytes < previous_upload_bytes: # Counter wrapped
+                    _LOGGER.warning("Rx Bytes counter for %s wrapped. Diff: %s", interface, upload_diff)
+
+                download_speed = ((download_diff / (1024*1024)) / elapsed_seconds)   # Convert bytes to MB/s
+                upload_speed = ((upload_diff / (1024*1024)) / elapsed_seconds)  # Convert bytes to MB/s
             
             speeds_per_interface[interface] = {                                
                 "download": download_speed ,  # Convert bytes to MB
@@ -209,8 +363,72 @@ class RouterApiClient:
         }
 
 
-    async def async_get_stats(self) -> Dict[str, Any]:
-        """Fetch and process router statistics."""
+    def add_recorder(self, recorder: RawResponseRecorder) -> None:
+        """Attach a raw response recorder; every response is appended to each one attached."""
+        if recorder not in self._recorders:
+            self._recorders.append(recorder)
+
+    async def async_remove_recorder(self, recorder: RawResponseRecorder) -> None:
+        """Detach a raw response recorder and write its buffered records."""
+        if recorder in self._recorders:
+            self._recorders.remove(recorder)
+            await self._async_flush_capture(recorder)
+
+    async def async_get_stats(self, max_age: float = SHARED_POLL_WINDOW_SECONDS) -> Dict[str, Any]:
+        """
+        Fetch and process router statistics.
+
+        The client may be shared by several config entries (see
+        client_registry.py): callers arriving while a fetch is in flight, or
+        within max_age seconds of the last one, get that same snapshot instead
+        of polling the router again. The snapshot is shared, so callers must
+        not modify it.
+        """
+        if self._inflight is None:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_monotonic < max_age:
+                return self._snapshot
+            self._inflight = asyncio.ensure_future(self._async_fetch_stats())
+            # Registered before any waiter's shield, so it runs before they resume
+            self._inflight.add_done_callback(self._fetch_done)
+        # A cancelled caller does not cancel the fetch the others are waiting on
+        return await asyncio.shield(self._inflight)
+
+    def _fetch_done(self, task: "asyncio.Future[Dict[str, Any]]") -> None:
+        """Clear the finished fetch and keep its snapshot.
+
+        Runs even when every waiter was cancelled, which also retrieves the
+        exception of a failed fetch nobody awaits any more.
+        """
+        self._inflight = None
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._snapshot = task.result()
+        self._snapshot_monotonic = time.monotonic()
+
+    async def async_get_counters(self) -> Dict[str, List[int]]:
+        """
+        Read the LAN byte counters without computing speeds.
+
+        Unlike async_get_stats, this neither shares a snapshot nor touches the
+        previous-sample state the coordinators' speeds are computed from, so
+        a caller polling faster (the live stream) can compute its own rates.
+        Returns {interface: raw counters}.
+        """
+        try:
+            payload = await self._get_raw_stats()
+        except aiohttp.ClientResponseError as e:
+            if e.status != 401:
+                raise
+            _LOGGER.warning("Authentication failed (401). Retrying authentication.")
+            self._session_id = None
+            await self._authenticate()
+            payload = await self._get_raw_stats()
+        if self._offload_threshold is not None and len(payload) >= self._offload_threshold:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, parse_stats_counters, payload)
+        return parse_stats_counters(payload)
+
+    async def _async_fetch_stats(self) -> Dict[str, Any]:
+        """Poll the router once and process the response."""
         if not self._session_id:
              try:
                  await self._authenticate()
@@ -218,36 +436,164 @@ class RouterApiClient:
                  _LOGGER.error("Failed initial authentication: %s", e)
                  raise
 
+        # Endpoints due in this poll are fetched concurrently over the same session
+        due = self._due_endpoints(datetime.now().astimezone())
+        results = await self._fetch_endpoints(due)
+        unauthorized = [name for name, r in results.items() if isinstance(r, aiohttp.ClientResponseError) and r.status == 401]
+        if unauthorized:
+            _LOGGER.warning("Authentication failed (401). Retrying authentication.")
+            self._session_id = None
+            await self._authenticate()
+            # Only the endpoints that were refused are read again
+            results.update(await self._fetch_endpoints(unauthorized))
+
+        payload = results.pop(STATS_ENDPOINT_LAN)
+        if isinstance(payload, Exception):
+            _LOGGER.error("Failed to get raw stats: %s", payload)
+            raise payload
+
+        current_time = datetime.now().astimezone()
+        # Bytes as received, before parsing, so unparseable responses (e.g. a
+        # login page) are captured too and a replay sees exactly what the router sent
+        self._capture(current_time, STATS_ENDPOINT_LAN, payload)
         try:
-            raw_data = await self._get_raw_stats()
-        except aiohttp.ClientResponseError as e:
-            if e.status == 401:
-                _LOGGER.warning("Authentication failed (401). Retrying authentication.")
-                self._session_id = None
-                await self._authenticate()
-                raw_data = await self._get_raw_stats()
-            else:
-                raise
-        except Exception as e:
-            _LOGGER.error("Failed to get raw stats: %s", e)
+            _, processed_data = await self._async_process_payload(payload, current_time)
+        except Exception:
+            await self._async_flush_ready_captures()
             raise
 
-        current_time = datetime.now()
-        html_stats = raw_data.get("stats", "")
-        parsed_current_stats = self._parse_html_table(html_stats)
+        for name, data in results.items():
+            if isinstance(data, Exception):
+                # An extra endpoint failing keeps its previous value and does not fail the poll
+                _LOGGER.warning("Failed to get stats from endpoint %s: %s", name, data)
+                continue
+            self._capture(current_time, name, data)
+            last_fetch = self._endpoint_last_fetch.get(name)
+            elapsed_seconds = (current_time - last_fetch).total_seconds() if last_fetch else 0
+            try:
+                _, self._endpoint_data[name], self._endpoint_previous[name] = process_stats_payload(
+                    data, self._endpoint_previous.get(name, {}), elapsed_seconds
+                )
+            except ValueError as e:
+                _LOGGER.warning("Unexpected stats from endpoint %s: %s", name, e)
+                continue
+            self._endpoint_last_fetch[name] = current_time
 
-        elapsed_seconds = 0
-        if self._last_update_time:
-            elapsed_seconds = (current_time - self._last_update_time).total_seconds()
+        await self._async_flush_ready_captures()
 
-        # Call the new calculation and categorization method
-        processed_data = self._calculate_and_categorize_stats(parsed_current_stats, elapsed_seconds)
+        processed_data["endpoints"] = dict(self._endpoint_data)
+        return processed_data
 
-        # Update previous stats for the next cycle
-        new_previous_stats = {}
-        for row in parsed_current_stats:
-            new_previous_stats[row["interface"]] = row
+    def _elapsed_seconds(self, current_time: datetime) -> float:
+        """Return the seconds since the previous processed response."""
+        if self._last_update_time:
+            return (current_time - self._last_update_time).total_seconds()
+        return 0
+
+    def _gap(self, current_time: datetime, elapsed_seconds: float) -> Optional[Dict[str, Any]]:
+        """Describe the gap before this sample, or None if no poll was missed."""
+        if self._gap_threshold is None or self._last_update_time is None or elapsed_seconds <= self._gap_threshold:
+            return None
+        _LOGGER.info("No stats for %.0f seconds, speeds of this sample are averages over the gap", elapsed_seconds)
+        return {"start": self._last_update_time.isoformat(), "end": current_time.isoformat(), "seconds": elapsed_seconds}
+
+    def _commit_sample(self, current_time: datetime, processed_data: Dict[str, Any], new_previous_stats: Dict[str, Any], gap: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Keep a processed sample as the previous one for the next cycle."""
+        processed_data["gap"] = gap
         self._previous_stats = new_previous_stats
         self._last_update_time = current_time
+        return processed_data
+
+    def _process_payload(self, payload: bytes, current_time: datetime) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Process a raw stats payload received at current_time inline (used by replay_capture)."""
+        elapsed_seconds = self._elapsed_seconds(current_time)
+        gap = self._gap(current_time, elapsed_seconds)
+        raw_data, processed_data, new_previous_stats = process_stats_payload(payload, self._previous_stats, elapsed_seconds, gap is not None)
+        return raw_data, self._commit_sample(current_time, processed_data, new_previous_stats, gap)
 
-        return processed_data
\ No newline at end of file
+    async def _async_process_payload(self, payload: bytes, current_time: datetime, offload: Optional[bool] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Process a raw stats payload received at current_time.
+
+        Large payloads go to the executor so parsing does not block the event
+        loop; small ones stay inline, where the executor hop would cost more
+        than the parsing, and while the offload veto holds (profiling).
+        offload forces either path (used for benchmarking).
+        Returns (raw_data, processed_data); processed_data["gap"] describes
+        the missed polls before this sample, if any.
+        """
+        if offload is None:
+            offload = (
+                self._offload_threshold is not None
+                and len(payload) >= self._offload_threshold
+                and not (self._offload_veto and self._offload_veto())
+            )
+        elapsed_seconds = self._elapsed_seconds(current_time)
+        gap = self._gap(current_time, elapsed_seconds)
+
+        started = time.perf_counter()
+        if offload:
+            raw_data, processed_data, new_previous_stats = await asyncio.get_running_loop().run_in_executor(
+                self._executor, process_stats_payload, payload, self._previous_stats, elapsed_seconds, gap is not None
+            )
+        else:
+            raw_data, processed_data, new_previous_stats = process_stats_payload(payload, self._previous_stats, elapsed_seconds, gap is not None)
+        _LOGGER.debug(
+            "Processed %s bytes of stats %s in %.1f ms",
+            len(payload), "in executor" if offload else "inline", (time.perf_counter() - started) * 1000,
+        )
+
+        return raw_data, self._commit_sample(current_time, processed_data, new_previous_stats, gap)
+
+    def _capture(self, received_at: datetime, endpoint: str, payload: bytes) -> None:
+        """Append a raw response to every attached recorder."""
+        for recorder in self._recorders:
+            recorder.append(received_at, endpoint, payload)
+
+    async def _async_flush_ready_captures(self) -> None:
+        """Write the buffered records of every recorder with a full batch."""
+        for recorder in list(self._recorders):
+            if recorder.batch_ready:
+                await self._async_flush_capture(recorder)
+
+    async def _async_flush_capture(self, recorder: RawResponseRecorder) -> None:
+        """Write a recorder's buffered records without blocking the event loop."""
+        batch = recorder.take_batch()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, recorder.write_batch, batch)
+        except OSError as e:
+            _LOGGER.error("Failed to write capture log %s: %s", recorder.path, e)
+
+    async def async_close(self) -> None:
+        """Flush any pending capture records."""
+        for recorder in list(self._recorders):
+            await self._async_flush_capture(recorder)
+
+
+def _decode_stats_payload(payload: bytes) -> Dict[str, Any]:
+    """Decode a raw stats payload, checking it has the 'stats' table."""
+    raw_data = json.loads(payload)
+    if "stats" not in raw_data or not isinstance(raw_data["stats"], str):
+        raise ValueError("Unexpected API response format: 'stats' field missing or not a string.")
+    return raw_data
+
+
+def parse_stats_counters(payload: bytes) -> Dict[str, List[int]]:
+    """Decode and parse a raw stats payload into {interface: raw counters}."""
+    raw_data = _decode_stats_payload(payload)
+    return {row["interface"]: row["data"] for row in RouterApiClient._parse_html_table(raw_data["stats"])}
+
+
+def process_stats_payload(payload: bytes, previous_stats: Dict[str, Any], elapsed_seconds: float, after_gap: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Decode, parse and compute one raw stats payload (fgw.lanstatistics.json or the same table from another endpoint).
+
+    Free of side effects (previous_stats is only read), so it can run inline,
+    in a thread pool or in a process pool.
+    Returns (raw_data, processed_data, new_previous_stats).
+    """
+    raw_data = _decode_stats_payload(payload)
+    parsed_current_stats = RouterApiClient._parse_html_table(raw_data["stats"])
+    processed_data = RouterApiClient._calculate_and_categorize_stats(parsed_current_stats, previous_stats, elapsed_seconds, after_gap)
+    new_previous_stats = {row["interface"]: row for row in parsed_current_stats}
+    return raw_data, processed_data, new_previous_stats
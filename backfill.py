@@ -0,0 +1,145 @@
+# custom_components/HA_MEO_router_traffic_monitor/backfill.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_import_statistics, get_last_statistics
+from homeassistant.const import UnitOfDataRate, UnitOfInformation
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, API_RX_BYTES_IDX, API_TX_BYTES_IDX, GAP_BACKFILL_MAX_HOURS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _gap_hours(start: datetime, end: datetime) -> List[datetime]:
+    """Return the start of every whole hour between start and end."""
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    if hour < start:
+        hour += timedelta(hours=1)
+    hours = []
+    while hour + timedelta(hours=1) <= end:
+        hours.append(hour)
+        hour += timedelta(hours=1)
+    return hours
+
+
+def _speed_targets(data: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """Return (unique_id suffix, average speed over the gap) for every speed sensor."""
+    targets = []
+    for interface, values in data.get("interfaces", {}).items():
+        for data_key in ("download", "upload"):
+            targets.append((f"{interface}_{data_key}_speed", values.get(data_key, 0)))
+    totals = data.get("totals", {})
+    for category in ("ethernet", "wifi", "global"):
+        for data_key in ("download_speed", "upload_speed"):
+            targets.append((f"total_{category}_{data_key}", totals.get(f"{category}_{data_key}", 0)))
+    return targets
+
+
+def _sum_targets(deltas: Dict[Tuple[str, str], List[int]], cycles: List[str]) -> List[Tuple[str, int]]:
+    """Return (unique_id suffix, bytes over the gap) for every total-bytes and usage sensor."""
+    targets = []
+    for (group, key), (download, upload) in deltas.items():
+        # Os sensores de bytes totais seguem os índices do router: Rx = upload, Tx = download
+        if group == "interfaces":
+            targets.append((f"{key}_raw_{API_RX_BYTES_IDX}_total", upload))
+            targets.append((f"{key}_raw_{API_TX_BYTES_IDX}_total", download))
+        else:
+            targets.append((f"total_{key}_raw_{API_RX_BYTES_IDX}", upload))
+            targets.append((f"total_{key}_raw_{API_TX_BYTES_IDX}", download))
+        for cycle in cycles:
+            targets.append((f"{group}_{key}_download_{cycle}_usage", download))
+            targets.append((f"{group}_{key}_upload_{cycle}_usage", upload))
+    return targets
+
+
+async def _async_last_sum(hass: HomeAssistant, statistic_id: str) -> Optional[Tuple[datetime, float]]:
+    """Return (start, sum) of the latest long-term statistics row, if any."""
+    last = await get_instance(hass).async_add_executor_job(get_last_statistics, hass, 1, statistic_id, True, {"sum"})
+    rows = last.get(statistic_id)
+    if not rows:
+        return None
+    start = rows[0]["start"]
+    if isinstance(start, (int, float)):
+        start = dt_util.utc_from_timestamp(start)
+    return start, rows[0].get("sum") or 0
+
+
+async def async_backfill_gap(hass: HomeAssistant, entry_id: str, data: Dict[str, Any], deltas: Dict[Tuple[str, str], List[int]], cycles: List[str]) -> None:
+    """
+    Fill the long-term statistics of the sensors for the hours of a gap.
+
+    The first sample after a gap has speeds averaged from the counter deltas
+    over the whole gap. Every whole hour inside the gap had no valid state,
+    so each speed sensor gets a statistics row with that average as its
+    mean, min and max. The total-bytes and usage sensors get sum rows that
+    grow from the last sum before the gap by the bytes of the gap (deltas,
+    the usage added by the post-gap poll), spread evenly over the gap, so
+    the hourly changes show the traffic where it happened instead of in the
+    hour the polls resumed. Partial hours at the edges keep what the
+    recorder compiles from the real states.
+    """
+    gap = data.get("gap")
+    if not gap or "recorder" not in hass.config.components:
+        return
+
+    gap_start = dt_util.as_utc(datetime.fromisoformat(gap["start"]))
+    hours = _gap_hours(gap_start, dt_util.as_utc(datetime.fromisoformat(gap["end"])))
+    if not hours:
+        return
+    if len(hours) > GAP_BACKFILL_MAX_HOURS:
+        _LOGGER.warning("Gap of %s hours is too long to backfill, skipping", len(hours))
+        return
+
+    registry = er.async_get(hass)
+    backfilled = 0
+    for unique_suffix, speed in _speed_targets(data):
+        entity_id = registry.async_get_entity_id("sensor", DOMAIN, f"{DOMAIN}_{entry_id}_{unique_suffix}")
+        if entity_id is None:
+            continue
+        metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=None,
+            source="recorder",
+            statistic_id=entity_id,
+            unit_of_measurement=UnitOfDataRate.MEGABYTES_PER_SECOND,
+        )
+        statistics = [StatisticData(start=hour, mean=speed, min=speed, max=speed) for hour in hours]
+        async_import_statistics(hass, metadata, statistics)
+        backfilled += 1
+
+    for unique_suffix, delta in _sum_targets(deltas, cycles):
+        entity_id = registry.async_get_entity_id("sensor", DOMAIN, f"{DOMAIN}_{entry_id}_{unique_suffix}")
+        if entity_id is None:
+            continue
+        last = await _async_last_sum(hass, entity_id)
+        # Sem histórico, ou com linhas já dentro do gap (ex.: preenchido antes), não há nada a preencher
+        if last is None or last[0] >= hours[0]:
+            continue
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=None,
+            source="recorder",
+            statistic_id=entity_id,
+            unit_of_measurement=UnitOfInformation.BYTES,
+        )
+        # A soma no fim de cada hora inclui a parte do gap decorrida até lá
+        statistics = [
+            StatisticData(
+                start=hour,
+                sum=last[1] + delta * min(1.0, (hour + timedelta(hours=1) - gap_start).total_seconds() / gap["seconds"]),
+            )
+            for hour in hours
+        ]
+        async_import_statistics(hass, metadata, statistics)
+        backfilled += 1
+
+    _LOGGER.info("Backfilled %s hours of statistics for %s sensors after a gap", len(hours), backfilled)
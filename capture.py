@@ -0,0 +1,156 @@
+# custom_components/HA_MEO_router_traffic_monitor/capture.py
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .const import DEFAULT_CAPTURE_MAX_BYTES, CAPTURE_FLUSH_RECORDS, STATS_ENDPOINT_LAN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RawResponseRecorder:
+    """Record raw router responses to a bounded, gzip-compressed append-only log.
+
+    Each record is a JSON header line ({"t", "endpoint", "size"}) followed by
+    the response body exactly as received from the router (size bytes) and a
+    newline. Records are buffered in memory and written as one gzip member
+    per batch, so the file stays readable with a plain gzip.open() even if HA
+    stops between batches. Once the log grows past max_bytes it is rotated to
+    '<path>.1', which bounds disk usage to roughly twice max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_CAPTURE_MAX_BYTES, flush_records: int = CAPTURE_FLUSH_RECORDS):
+        """Initialize the recorder."""
+        self._path = path
+        self._max_bytes = max_bytes
+        self._flush_records = flush_records
+        self._pending: List[bytes] = []
+
+    @property
+    def path(self) -> str:
+        """Return the path of the active capture file."""
+        return self._path
+
+    @property
+    def batch_ready(self) -> bool:
+        """Return True once enough records are buffered to write a batch."""
+        return len(self._pending) >= self._flush_records
+
+    def append(self, received_at: datetime, endpoint: str, payload: bytes) -> bool:
+        """Buffer one raw response body. Returns True once a batch is ready to be written."""
+        header = json.dumps(
+            {"t": received_at.timestamp(), "endpoint": endpoint, "size": len(payload)},
+            separators=(",", ":"),
+        )
+        self._pending.append(header.encode() + b"\n" + payload + b"\n")
+        return self.batch_ready
+
+    def take_batch(self) -> List[bytes]:
+        """Hand over the buffered records, leaving the buffer empty."""
+        batch, self._pending = self._pending, []
+        return batch
+
+    def write_batch(self, batch: List[bytes]) -> None:
+        """Write a batch to disk (blocking, run it in an executor)."""
+        if not batch:
+            return
+        try:
+            if os.path.getsize(self._path) >= self._max_bytes:
+                os.replace(self._path, f"{self._path}.1")
+                _LOGGER.debug("Capture log %s rotated", self._path)
+        except FileNotFoundError:
+            pass
+        with gzip.open(self._path, "ab") as capture_file:
+            capture_file.write(b"".join(batch))
+
+
+def read_capture(path: str) -> Iterator[Tuple[datetime, str, bytes]]:
+    """Yield (received_at, endpoint, raw payload) from a capture log, oldest first."""
+    for file_path in (f"{path}.1", path):
+        if not os.path.exists(file_path):
+            continue
+        try:
+            with gzip.open(file_path, "rb") as capture_file:
+                for line in capture_file:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    payload = capture_file.read(record["size"])
+                    if len(payload) != record["size"]:
+                        raise EOFError("record body cut short")
+                    capture_file.read(1) # Newline after the body
+                    yield datetime.fromtimestamp(record["t"]).astimezone(), record["endpoint"], payload
+        except (EOFError, zlib.error, json.JSONDecodeError) as e:
+            # A batch interrupted mid-write only loses its own records
+            _LOGGER.warning("Capture log %s is truncated, stopping there: %s", file_path, e)
+
+
+def replay_capture(path: str, client: Any, endpoint: str = STATS_ENDPOINT_LAN, limit: Optional[int] = None) -> Iterator[Tuple[datetime, Dict[str, Any]]]:
+    """
+    Feed a capture log through the client's parse and compute pipeline.
+
+    Records are replayed as fast as they can be processed, through the same
+    process_stats_payload and previous-sample/gap handling as live polls,
+    using the recorded receipt timestamps for the elapsed time between
+    samples, so speeds, counter wraps and spikes come out exactly as they did live. The client only needs
+    to be constructed; it is never asked to talk to a router, e.g.:
+
+        client = RouterApiClient("replay", "", "", None)
+        for received_at, data in replay_capture("capture.jsonl.gz", client):
+            ...
+    """
+    replayed = 0
+    for received_at, name, payload in read_capture(path):
+        if name != endpoint:
+            continue
+        yield received_at, client._process_payload(payload, received_at)[1]
+        replayed += 1
+        if limit is not None and replayed >= limit:
+            return
+
+
+async def async_measure_loop_lag(path: str, client: Any, offload: bool, endpoint: str = STATS_ENDPOINT_LAN, probe_interval: float = 0.005) -> Dict[str, float]:
+    """
+    Replay a capture log through the client's async processing path and measure event loop lag.
+
+    A probe task sleeps probe_interval in a loop and records how late it
+    wakes up, which is how long the loop was blocked by whatever ran in the
+    meantime. Run it with offload True and False to compare, e.g.:
+
+        lag = await async_measure_loop_lag("capture.jsonl.gz", RouterApiClient("replay", "", "", None), offload=True)
+    """
+    loop = asyncio.get_running_loop()
+    lags: List[float] = []
+    replaying = True
+
+    async def probe() -> None:
+        while replaying:
+            started = loop.time()
+            await asyncio.sleep(probe_interval)
+            lags.append(loop.time() - started - probe_interval)
+
+    probe_task = asyncio.create_task(probe())
+    samples = 0
+    try:
+        for received_at, name, payload in read_capture(path):
+            if name != endpoint:
+                continue
+            await client._async_process_payload(payload, received_at, offload)
+            samples += 1
+            # Give the probe a chance to run between samples, as between real polls
+            await asyncio.sleep(probe_interval)
+    finally:
+        replaying = False
+        await probe_task
+
+    return {
+        "samples": samples,
+        "max_lag_ms": max(lags, default=0.0) * 1000,
+        "mean_lag_ms": (sum(lags) / len(lags) if lags else 0.0) * 1000,
+    }
@@ -0,0 +1,70 @@
+# custom_components/HA_MEO_router_traffic_monitor/client_registry.py
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import DOMAIN
+from .api_client import RouterApiClient
+from .capture import RawResponseRecorder
+from .live import LiveThroughputStream
+
+_LOGGER = logging.getLogger(__name__)
+
+# Guardado à parte de hass.data[DOMAIN], que só contém coordenadores por entry_id
+DATA_CLIENTS = f"{DOMAIN}_clients"
+
+
+@callback
+def async_get_shared_client(hass: HomeAssistant, host: str, username: str, password: str, recorder: Optional[RawResponseRecorder] = None) -> RouterApiClient:
+    """
+    Return the client for this router and credentials, creating it if needed.
+
+    Config entries (and config flow validations) pointing at the same router
+    share one client, so they use one SESSIONID instead of invalidating each
+    other's, and share each poll. A user's recorder captures the responses
+    to its own file until that user releases the client. Every call must be
+    paired with async_release_shared_client, passing the same recorder.
+    """
+    clients: Dict[Tuple[str, str, str], Dict[str, Any]] = hass.data.setdefault(DATA_CLIENTS, {})
+    key = (host, username, password)
+    shared = clients.get(key)
+    if shared is None:
+        client = RouterApiClient(host, username, password, async_get_clientsession(hass))
+        # Um só stream em tempo real por router, para as entradas não o lerem cada uma à sua vez
+        shared = clients[key] = {"client": client, "users": 0, "live": LiveThroughputStream(hass, client)}
+    else:
+        _LOGGER.debug("Reusing the existing client for %s", host)
+
+    shared["users"] += 1
+    if recorder is not None:
+        shared["client"].add_recorder(recorder)
+    return shared["client"]
+
+
+@callback
+def async_get_live_stream(hass: HomeAssistant, client: RouterApiClient) -> LiveThroughputStream:
+    """Return the live throughput stream of a shared client."""
+    for shared in hass.data[DATA_CLIENTS].values():
+        if shared["client"] is client:
+            return shared["live"]
+    raise KeyError("Client is not registered")
+
+
+async def async_release_shared_client(hass: HomeAssistant, client: RouterApiClient, recorder: Optional[RawResponseRecorder] = None) -> None:
+    """Release a client, detaching and flushing the user's recorder; the last user drops it."""
+    if recorder is not None:
+        await client.async_remove_recorder(recorder)
+    clients = hass.data.get(DATA_CLIENTS, {})
+    for key, shared in clients.items():
+        if shared["client"] is client:
+            shared["users"] -= 1
+            if shared["users"] <= 0:
+                clients.pop(key)
+                shared["live"].async_end_subscriptions()
+                await client.async_close()
+                if not clients:
+                    hass.data.pop(DATA_CLIENTS)
+            return
@@ -8,11 +8,10 @@ import asyncio # Para timeout
 from homeassistant import config_entries
 from homeassistant.const import CONF_URL, CONF_SCAN_INTERVAL, CONF_USERNAME, CONF_PASSWORD
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers import selector
 
-from .const import DOMAIN, DEFAULT_SCAN_INTERVAL_SECONDS, CONF_HOST
-from .api_client import RouterApiClient # Vamos criar este cliente na próxima seção
+from .const import DOMAIN, DEFAULT_SCAN_INTERVAL_SECONDS, CONF_HOST, CONF_CAPTURE_RAW, CONF_USAGE_CYCLES, DEFAULT_USAGE_CYCLES, USAGE_CYCLES, CONF_WAN_STATS_PATH, CONF_WAN_STATS_INTERVAL, DEFAULT_WAN_STATS_INTERVAL
+from .client_registry import async_get_shared_client, async_release_shared_client
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -42,10 +41,9 @@ class RouterTrafficSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             password = user_input[CONF_PASSWORD]
             scan_interval = user_input.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL_SECONDS)
 
+            # Reutiliza o cliente de uma entrada existente para o mesmo router, sem novo login
+            api_client = async_get_shared_client(self.hass, host, username, password)
             try:
-                session = async_get_clientsession(self.hass)
-                api_client = RouterApiClient(host, username, password, session)
-                
                 # Tentar autenticar e obter os dados iniciais
                 # Isso valida as credenciais e a acessibilidade da API
                 await api_client.async_get_stats()
@@ -66,6 +64,8 @@ class RouterTrafficSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     errors["base"] = "invalid_auth"
                 elif isinstance(e, asyncio.TimeoutError):
                     errors["base"] = "timeout_connect"
+            finally:
+                await async_release_shared_client(self.hass, api_client)
 
         return self.async_show_form(
             step_id="user",
@@ -101,6 +101,30 @@ class RouterTrafficSensorOptionsFlowHandler(config_entries.OptionsFlow):
                     min=5, max=3600, mode=selector.NumberSelectorMode.SLIDER, unit_of_measurement="seconds"
                 )
             ),
+            vol.Optional(
+                CONF_CAPTURE_RAW,
+                default=self.config_entry.options.get(CONF_CAPTURE_RAW, False),
+            ): selector.BooleanSelector(),
+            vol.Optional(
+                CONF_USAGE_CYCLES,
+                default=self.config_entry.options.get(CONF_USAGE_CYCLES, DEFAULT_USAGE_CYCLES),
+            ): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=USAGE_CYCLES, multiple=True, mode=selector.SelectSelectorMode.LIST
+                )
+            ),
+            vol.Optional(
+                CONF_WAN_STATS_PATH,
+                default=self.config_entry.options.get(CONF_WAN_STATS_PATH, ""),
+            ): selector.TextSelector(),
+            vol.Optional(
+                CONF_WAN_STATS_INTERVAL,
+                default=self.config_entry.options.get(CONF_WAN_STATS_INTERVAL, DEFAULT_WAN_STATS_INTERVAL),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0, max=3600, mode=selector.NumberSelectorMode.BOX, unit_of_measurement="seconds"
+                )
+            ),
         })
 
         return self.async_show_form(
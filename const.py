@@ -15,4 +15,55 @@ DEFAULT_SCAN_INTERVAL_SECONDS = 2 # 5 minutos (300 segundos) como padrão
 # ... (seus índices da tabela HTML)
 API_RX_BYTES_IDX = 0
 API_TX_BYTES_IDX = 8
-API_INTERFACE_NAME_IDX = 0 # Adicionei este para consistência, se não tiver, pode remover
\ No newline at end of file
+API_INTERFACE_NAME_IDX = 0 # Adicionei este para consistência, se não tiver, pode remover
+
+# Endpoints de estatísticas lidos com a mesma sessão (SESSIONID)
+# "interval": segundos mínimos entre leituras (0 = em todas as atualizações)
+# Outros endpoints registam-se com RouterApiClient.register_endpoint
+STATS_ENDPOINT_LAN = "lan"
+STATS_ENDPOINTS = {
+    STATS_ENDPOINT_LAN: {"path": "/ss-json/fgw.lanstatistics.json", "interval": 0},
+}
+
+# Endpoint opcional de estatísticas WAN (mesma tabela "stats" que o LAN), configurado nas opções
+STATS_ENDPOINT_WAN = "wan" # Prefixo dos unique_id dos sensores WAN; o endpoint é nomeado pelo caminho
+CONF_WAN_STATS_PATH = "wan_stats_path" # Vazio = desativado
+CONF_WAN_STATS_INTERVAL = "wan_stats_interval"
+DEFAULT_WAN_STATS_INTERVAL = 0 # 0 = em todas as atualizações
+
+# Entradas com o mesmo router partilham o cliente; pedidos dentro desta janela reutilizam a mesma leitura
+SHARED_POLL_WINDOW_SECONDS = 1
+
+# Respostas de estatísticas a partir deste tamanho são processadas fora do event loop
+OFFLOAD_THRESHOLD_BYTES = 32 * 1024
+# Captura de respostas brutas do router (para análise offline e replay)
+CONF_CAPTURE_RAW = "capture_raw"
+DEFAULT_CAPTURE_MAX_BYTES = 20 * 1024 * 1024 # Roda o ficheiro a partir de 20 MB
+CAPTURE_FLUSH_RECORDS = 30 # Número de respostas escritas de cada vez
+
+# Acumuladores de consumo (hora/dia/mês) guardados entre reinícios
+CONF_USAGE_CYCLES = "usage_cycles"
+USAGE_CYCLE_HOURLY = "hourly"
+USAGE_CYCLE_DAILY = "daily"
+USAGE_CYCLE_MONTHLY = "monthly"
+USAGE_CYCLES = [USAGE_CYCLE_HOURLY, USAGE_CYCLE_DAILY, USAGE_CYCLE_MONTHLY]
+DEFAULT_USAGE_CYCLES = [USAGE_CYCLE_DAILY, USAGE_CYCLE_MONTHLY]
+USAGE_STORAGE_VERSION = 1
+USAGE_SAVE_DELAY_SECONDS = 60 # Agrupa as escritas em disco em vez de gravar a cada atualização
+
+# Serviço de profiling das leituras (cProfile + tracemalloc)
+SERVICE_PROFILE = "profile"
+ATTR_POLLS = "polls"
+DEFAULT_PROFILE_POLLS = 10
+ATTR_TIMEOUT = "timeout"
+DEFAULT_PROFILE_TIMEOUT_SECONDS = 600 # O perfil termina mesmo que as leituras não aconteçam
+MIN_PROFILE_TIMEOUT_SECONDS = 10 # Igual ao mínimo do campo em services.yaml
+PROFILE_TOP_ALLOCATIONS = 25 # Linhas no relatório de alocações
+
+# Stream de débito em tempo real por websocket (só ativo com subscritores)
+LIVE_POLL_INTERVAL_SECONDS = 0.5
+LIVE_BATCH_SIZE = 2 # Amostras enviadas em cada mensagem
+
+# Deteção de falhas de leitura (gaps) e preenchimento das estatísticas de longo prazo
+GAP_FACTOR = 3 # Um intervalo entre leituras acima de 3x o configurado é um gap
+GAP_BACKFILL_MAX_HOURS = 24 * 7 # Gaps mais longos não são preenchidos
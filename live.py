@@ -0,0 +1,154 @@
+# custom_components/HA_MEO_router_traffic_monitor/live.py
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DOMAIN, LIVE_POLL_INTERVAL_SECONDS, LIVE_BATCH_SIZE
+from .api_client import RouterApiClient, counter_delta, traffic_counters
+
+_LOGGER = logging.getLogger(__name__)
+
+WS_TYPE_LIVE_THROUGHPUT = f"{DOMAIN}/live_throughput"
+ERR_ENTRY_UNLOADED = "entry_unloaded"
+
+class LiveThroughputStream:
+    """
+    Push per-interface download/upload rates to websocket subscribers.
+
+    There is one stream per shared client (see client_registry.py), so
+    entries on the same router share its fast poll. While at least one subscriber is connected the router is polled every
+    LIVE_POLL_INTERVAL_SECONDS, independently of the coordinator, and the
+    rates go straight to the subscribers without touching entity states (and
+    so the recorder). Rates are computed from the stream's own previous
+    counters, so the fast poll does not shorten the window the coordinators'
+    speeds are averaged over. Each message carries LIVE_BATCH_SIZE frames like:
+        {"t": 1700000000.5, "r": {"eth0": [download, upload], ...}, "g": [download, upload]}
+    with rates in MB/s, as in the speed sensors.
+    """
+
+    def __init__(self, hass: HomeAssistant, api_client: RouterApiClient) -> None:
+        """Initialize the stream."""
+        self._hass = hass
+        self._api_client = api_client
+        # token -> (owner entry_id, send_frames, end): end closes the subscription from the server side
+        self._subscribers: Dict[object, Tuple[str, Callable[[List[Dict[str, Any]]], None], Callable[[], None]]] = {}
+        self._unsub_timer: Optional[Callable[[], None]] = None
+        self._batch: List[Dict[str, Any]] = []
+        self._previous: Optional[Tuple[float, Dict[str, List[int]]]] = None # (monotonic time, counters)
+        self._polling = False
+
+    @callback
+    def async_subscribe(self, owner: str, send_frames: Callable[[List[Dict[str, Any]]], None], end: Callable[[], None]) -> Callable[[], None]:
+        """Add a subscriber for owner's entry, starting the fast poll for the first one. Returns the unsubscribe callback."""
+        token = object()
+        self._subscribers[token] = (owner, send_frames, end)
+        if self._unsub_timer is None:
+            _LOGGER.debug("Live throughput subscriber connected, starting fast poll")
+            self._unsub_timer = async_track_time_interval(
+                self._hass, self._async_poll, timedelta(seconds=LIVE_POLL_INTERVAL_SECONDS)
+            )
+
+        @callback
+        def unsubscribe() -> None:
+            self._subscribers.pop(token, None)
+            if not self._subscribers:
+                self.async_stop()
+
+        return unsubscribe
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the fast poll (last subscriber gone)."""
+        if self._unsub_timer is not None:
+            _LOGGER.debug("No live throughput subscribers left, stopping fast poll")
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._batch = []
+        self._previous = None
+
+    @callback
+    def async_end_subscriptions(self, owner: Optional[str] = None) -> None:
+        """End the subscriptions of owner's entry (entry unloaded), or all of them; stops the fast poll once none are left."""
+        for token, (subscriber_owner, _, end) in list(self._subscribers.items()):
+            if owner is None or subscriber_owner == owner:
+                del self._subscribers[token]
+                end()
+        if not self._subscribers:
+            self.async_stop()
+
+    async def _async_poll(self, now: datetime) -> None:
+        """Read the router counters and queue a frame of rates for the subscribers."""
+        if self._polling:
+            return # A previous read is still waiting on the router
+        self._polling = True
+        try:
+            counters = await self._api_client.async_get_counters()
+        except Exception as err:
+            _LOGGER.debug("Live throughput poll failed: %s", err)
+            return
+        finally:
+            self._polling = False
+        if not self._subscribers:
+            return
+
+        sampled = time.monotonic()
+        previous, self._previous = self._previous, (sampled, counters)
+        if previous is None or sampled <= previous[0]:
+            return # First read is the baseline
+        elapsed = sampled - previous[0]
+
+        rates = {}
+        for interface, raw in counters.items():
+            before = previous[1].get(interface)
+            if before is None:
+                continue
+            (download_bytes, upload_bytes), (previous_download, previous_upload) = traffic_counters(raw), traffic_counters(before)
+            download = counter_delta(download_bytes, previous_download) / (1024*1024) / elapsed
+            upload = counter_delta(upload_bytes, previous_upload) / (1024*1024) / elapsed
+            rates[interface] = [round(download, 3), round(upload, 3)]
+
+        self._batch.append({
+            "t": round(time.time(), 3),
+            "r": rates,
+            "g": [round(sum(rate[0] for rate in rates.values()), 3), round(sum(rate[1] for rate in rates.values()), 3)],
+        })
+        if len(self._batch) < LIVE_BATCH_SIZE:
+            return
+
+        frames, self._batch = self._batch, []
+        for _, send_frames, _ in list(self._subscribers.values()):
+            send_frames(frames)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): WS_TYPE_LIVE_THROUGHPUT,
+    vol.Required("entry_id"): str,
+})
+@callback
+def websocket_live_throughput(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    """Subscribe to the live throughput frames of a config entry."""
+    coordinator = hass.data.get(DOMAIN, {}).get(msg["entry_id"])
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found")
+        return
+
+    @callback
+    def send_frames(frames: List[Dict[str, Any]]) -> None:
+        connection.send_message(websocket_api.event_message(msg["id"], {"frames": frames}))
+
+    @callback
+    def end() -> None:
+        # Entrada descarregada: a subscrição termina com um erro no mesmo id
+        connection.subscriptions.pop(msg["id"], None)
+        connection.send_error(msg["id"], ERR_ENTRY_UNLOADED, "Config entry unloaded")
+
+    connection.subscriptions[msg["id"]] = coordinator.live.async_subscribe(msg["entry_id"], send_frames, end)
+    connection.send_result(msg["id"])
@@ -0,0 +1,128 @@
+# custom_components/HA_MEO_router_traffic_monitor/profiler.py
+
+import cProfile
+import logging
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, PROFILE_TOP_ALLOCATIONS
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_PROFILER = f"{DOMAIN}_profiler"
+
+
+class PollProfiler:
+    """
+    Profile the next N polls with cProfile and tracemalloc.
+
+    Coordinators check `active` before touching the profiler, so nothing is
+    wrapped while no profile is running. While it runs, every poll (fetch,
+    parsing, speed calculation) and the sensor state writes that follow it are
+    profiled. A poll counts once its update is done, failed or not, and the
+    profile also ends after a timeout, so it cannot stay running when polls
+    stop. cProfile sees the whole event loop while a poll is awaiting the
+    router, so other tasks running at that moment show up in the dump too.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the profiler."""
+        self.active = False
+        self._profile: Optional[cProfile.Profile] = None
+        self._depth = 0 # Coordinators may overlap while awaiting the same shared fetch
+        self._remaining = 0
+        self._output_prefix = ""
+        self._started_tracemalloc = False
+        self._finish_pending = False # Finish as soon as no coordinator is inside enable/disable
+        self._hass: Optional[HomeAssistant] = None
+        self._unsub_timeout: Optional[Callable[[], None]] = None
+
+    @property
+    def remaining(self) -> int:
+        """Return how many polls are left in the running profile."""
+        return self._remaining
+
+    def start(self, hass: HomeAssistant, polls: int, output_prefix: str, timeout: float) -> bool:
+        """Start profiling the next polls, for at most timeout seconds. Returns False if a profile is already running."""
+        if self.active:
+            return False
+        self._hass = hass
+        self._profile = cProfile.Profile()
+        self._remaining = polls
+        self._output_prefix = output_prefix
+        self._finish_pending = False
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        self._unsub_timeout = async_call_later(hass, timeout, self._async_timeout)
+        self.active = True
+        _LOGGER.info("Profiling the next %s polls (at most %s seconds), results in %s.*", polls, timeout, output_prefix)
+        return True
+
+    def enable(self) -> None:
+        """Start collecting (nested calls are counted)."""
+        if self._depth == 0:
+            self._profile.enable()
+        self._depth += 1
+
+    def disable(self) -> None:
+        """Stop collecting once the outermost caller is done."""
+        self._depth -= 1
+        if self._depth == 0:
+            self._profile.disable()
+            if self._finish_pending:
+                self._finish()
+
+    def poll_done(self) -> None:
+        """Count a finished poll (successful or not) and finish after the last one."""
+        if not self.active:
+            return
+        self._remaining -= 1
+        if self._remaining <= 0:
+            # The state writes of this poll run in the same loop iteration, right after the update
+            self._hass.loop.call_soon(self._request_finish)
+
+    @callback
+    def _async_timeout(self, _now: datetime) -> None:
+        """Finish a profile whose polls did not all happen in time."""
+        self._unsub_timeout = None
+        _LOGGER.warning("Profile timed out with %s polls left, writing what was collected", self._remaining)
+        self._request_finish()
+
+    def _request_finish(self) -> None:
+        """Finish now, or once the coordinators inside enable/disable are done."""
+        if not self.active:
+            return
+        self._finish_pending = True
+        if self._depth == 0:
+            self._finish()
+
+    def _finish(self) -> None:
+        """Stop the profile and write the reports in the background."""
+        self.active = False
+        self._finish_pending = False
+        if self._unsub_timeout is not None:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+        self._hass.async_create_task(self._async_write_reports(self._hass, self._profile, self._output_prefix, self._started_tracemalloc))
+        self._profile = None
+
+    async def _async_write_reports(self, hass: HomeAssistant, profile: cProfile.Profile, output_prefix: str, stop_tracemalloc: bool) -> None:
+        """Write the pstats dump and the allocations report to the config directory."""
+        await hass.async_add_executor_job(self._write_reports, profile, output_prefix, stop_tracemalloc)
+        _LOGGER.info("Profile written to %s.pstats and %s_allocations.txt", output_prefix, output_prefix)
+
+    @staticmethod
+    def _write_reports(profile: cProfile.Profile, output_prefix: str, stop_tracemalloc: bool) -> None:
+        profile.dump_stats(f"{output_prefix}.pstats")
+        snapshot = tracemalloc.take_snapshot()
+        if stop_tracemalloc:
+            tracemalloc.stop()
+        with open(f"{output_prefix}_allocations.txt", "w", encoding="utf-8") as report:
+            report.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocations by line\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                report.write(f"{stat}\n")
@@ -1,6 +1,7 @@
 # custom_components/router_traffic_sensor/sensor.py
 
 import logging
+from datetime import datetime
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
@@ -9,11 +10,25 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.const import UnitOfDataRate, UnitOfInformation
 
-from .const import DOMAIN, API_RX_BYTES_IDX, API_TX_BYTES_IDX
+from .const import DOMAIN, API_RX_BYTES_IDX, API_TX_BYTES_IDX, STATS_ENDPOINT_WAN, USAGE_CYCLE_HOURLY, USAGE_CYCLE_DAILY, USAGE_CYCLE_MONTHLY
 from .__init__ import RouterTrafficSensorCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+# Nomes apresentados para cada ciclo de consumo
+USAGE_CYCLE_NAMES = {
+    USAGE_CYCLE_HOURLY: "Hourly",
+    USAGE_CYCLE_DAILY: "Daily",
+    USAGE_CYCLE_MONTHLY: "Monthly",
+}
+
+def gap_attributes(data: dict) -> dict | None:
+    """Atributos de um valor de velocidade que é a média de um gap (leituras em falta)."""
+    gap = data.get("gap")
+    if not gap:
+        return None
+    return {"gap_average": True, "gap_seconds": round(gap["seconds"]), "gap_start": gap["start"]}
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -223,6 +238,66 @@ async def async_setup_entry(
         )
     )
 
+    # --- SENSORES WAN (ENDPOINT EXTRA) ---
+
+    # Velocidade e bytes totais por interface do endpoint WAN, se configurado nas opções
+    if coordinator.wan_endpoint:
+        wan_data = coordinator.data.get("endpoints", {}).get(coordinator.wan_endpoint)
+        if wan_data is None:
+            _LOGGER.warning("Sem estatísticas WAN na primeira leitura, os sensores WAN são criados no próximo recarregamento")
+        for interface_name in (wan_data or {}).get("interfaces", {}):
+            for data_key in ("download", "upload"):
+                entities.append(
+                    RouterTrafficSpeedSensor(
+                        coordinator,
+                        interface_name,
+                        data_key,
+                        f"Router WAN {interface_name} {data_key.capitalize()} Speed",
+                        UnitOfDataRate.MEGABYTES_PER_SECOND,
+                        SensorDeviceClass.DATA_RATE,
+                        SensorStateClass.MEASUREMENT,
+                        endpoint=coordinator.wan_endpoint,
+                    )
+                )
+            for data_index, direction in ((API_RX_BYTES_IDX, "Download"), (API_TX_BYTES_IDX, "Upload")):
+                entities.append(
+                    RouterTrafficTotalBytesSensor(
+                        coordinator,
+                        interface_name,
+                        data_index,
+                        f"Router WAN {interface_name} Total {direction}",
+                        UnitOfInformation.BYTES,
+                        SensorDeviceClass.DATA_SIZE,
+                        SensorStateClass.TOTAL_INCREASING,
+                        endpoint=coordinator.wan_endpoint,
+                    )
+                )
+
+    # --- SENSORES DE CONSUMO (HORA/DIA/MÊS) ---
+
+    # Consumo por interface e por categoria, para cada ciclo configurado
+    usage_targets = [("interfaces", interface_name, f"Router {interface_name}") for interface_name in coordinator.data["interfaces"]]
+    usage_targets += [
+        ("totals", "ethernet", "Router Ethernet"),
+        ("totals", "wifi", "Router Wi-Fi"),
+        ("totals", "global", "Router Global"),
+    ]
+    for cycle in coordinator.usage.cycles:
+        for group, key, name_prefix in usage_targets:
+            for direction in ("download", "upload"):
+                entities.append(
+                    RouterTrafficUsageSensor(
+                        coordinator,
+                        cycle,
+                        group,
+                        key,
+                        direction,
+                        f"{name_prefix} {USAGE_CYCLE_NAMES[cycle]} {direction.capitalize()}",
+                        UnitOfInformation.BYTES,
+                        SensorDeviceClass.DATA_SIZE,
+                        SensorStateClass.TOTAL,
+                    )
+                )
 
     async_add_entities(entities)
 
@@ -237,10 +312,12 @@ class RouterTrafficSensorBase(CoordinatorEntity, SensorEntity): # <--- Adicione
         name: str,
         unit_of_measurement: str, # <--- Adicione aqui
         device_class: SensorDeviceClass, # <--- Adicione aqui
-        state_class: SensorStateClass # <--- Adicione aqui
+        state_class: SensorStateClass, # <--- Adicione aqui
+        context: tuple | None = None
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        # O contexto (grupo, chave) permite ao coordenador notificar só as entidades cujos contadores mudaram
+        super().__init__(coordinator, context)
         self._attr_name = name
         self._attr_unique_id = f"{DOMAIN}_{coordinator.config_entry.entry_id}_{unique_suffix}"
         
@@ -257,15 +334,27 @@ class RouterTrafficSensorBase(CoordinatorEntity, SensorEntity): # <--- Adicione
             "manufacturer": "Unknown",
         }
 
+    def _interface_data(self, interface: str, endpoint: str | None) -> dict:
+        """Dados de uma interface das estatísticas LAN, ou de um endpoint extra (ex.: WAN)."""
+        data = self.coordinator.data
+        if endpoint:
+            data = data.get("endpoints", {}).get(endpoint) or {}
+        return data.get("interfaces", {}).get(interface, {})
+
 class RouterTrafficSpeedSensor(RouterTrafficSensorBase, SensorEntity):
     """Represents a router traffic speed sensor."""
 
-    def __init__(self, coordinator: RouterTrafficSensorCoordinator, interface: str, data_key: str, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass) -> None:
+    def __init__(self, coordinator: RouterTrafficSensorCoordinator, interface: str, data_key: str, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass, endpoint: str | None = None) -> None:
         """Initialize the speed sensor."""
         # Note que a unit_of_measurement está a ser passada para o super().__init__
-        super().__init__(coordinator, f"{interface}_{data_key}_speed", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class)
+        # Com endpoint, a interface vem do endpoint WAN em vez das estatísticas LAN
+        if endpoint:
+            super().__init__(coordinator, f"{STATS_ENDPOINT_WAN}_{interface}_{data_key}_speed", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("endpoints", endpoint))
+        else:
+            super().__init__(coordinator, f"{interface}_{data_key}_speed", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("interfaces", interface))
         self._interface = interface
         self._data_key = data_key
+        self._endpoint = endpoint
         # Armazenar a unidade para referência, se necessário na lógica de arredondamento
         self._unit = unit 
 
@@ -273,13 +362,20 @@ class RouterTrafficSpeedSensor(RouterTrafficSensorBase, SensorEntity):
     def native_value(self):
         """Return the state of the sensor, rounded."""
         # Aceder aos dados da interface individual
-        raw_value = self.coordinator.data.get("interfaces", {}).get(self._interface, {}).get(self._data_key, 0)
+        raw_value = self._interface_data(self._interface, self._endpoint).get(self._data_key, 0)
         
         # Verificar se o valor não é None e se é numérico antes de arredondar
         if isinstance(raw_value, (int, float)):
             return round(raw_value, 2) # Arredonda para 2 casas decimais
         return 0
 
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Flag a speed averaged over a gap of missed polls."""
+        if self._endpoint:
+            return None # Os gaps só são detetados nas estatísticas LAN
+        return gap_attributes(self.coordinator.data)
+
     @property
     def icon(self) -> str | None:
         """Return the icon to use in the frontend."""
@@ -290,16 +386,20 @@ class RouterTrafficSpeedSensor(RouterTrafficSensorBase, SensorEntity):
 class RouterTrafficTotalBytesSensor(RouterTrafficSensorBase, SensorEntity):
     """Represents a router total bytes sensor (for accumulated traffic)."""
 
-    def __init__(self, coordinator: RouterTrafficSensorCoordinator, interface: str, data_index: int, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass) -> None:
+    def __init__(self, coordinator: RouterTrafficSensorCoordinator, interface: str, data_index: int, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass, endpoint: str | None = None) -> None:
         """Initialize the total bytes sensor."""
-        super().__init__(coordinator, f"{interface}_raw_{data_index}_total", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class)
+        if endpoint:
+            super().__init__(coordinator, f"{STATS_ENDPOINT_WAN}_{interface}_raw_{data_index}_total", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("endpoints", endpoint))
+        else:
+            super().__init__(coordinator, f"{interface}_raw_{data_index}_total", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("interfaces", interface))
         self._interface = interface
         self._data_index = data_index
+        self._endpoint = endpoint
 
     @property
     def native_value(self):
         """Return the state of the sensor (total bytes)."""
-        raw_data = self.coordinator.data.get("interfaces", {}).get(self._interface, {}).get("raw", [])
+        raw_data = self._interface_data(self._interface, self._endpoint).get("raw", [])
         if self._data_index < len(raw_data):
             return raw_data[self._data_index]
         return 0
@@ -318,7 +418,7 @@ class RouterTotalTrafficSpeedSensor(RouterTrafficSensorBase, SensorEntity):
     def __init__(self, coordinator: RouterTrafficSensorCoordinator, category: str, data_key: str, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass) -> None:
         """Initialize the total speed sensor."""
         # Unique suffix agora inclui a categoria (ethernet, wifi, global)
-        super().__init__(coordinator, f"total_{category}_{data_key}", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class)
+        super().__init__(coordinator, f"total_{category}_{data_key}", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("totals", category))
         self._category = category # 'ethernet', 'wifi', 'global'
         self._data_key = f"{category}_{data_key}" # ex: 'ethernet_download_speed'
 
@@ -327,6 +427,11 @@ class RouterTotalTrafficSpeedSensor(RouterTrafficSensorBase, SensorEntity):
         """Return the state of the total speed sensor."""
         return self.coordinator.data.get("totals", {}).get(self._data_key, 0)
 
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Flag a speed averaged over a gap of missed polls."""
+        return gap_attributes(self.coordinator.data)
+
     @property
     def icon(self) -> str | None:
         """Return the icon to use in the frontend."""
@@ -341,7 +446,7 @@ class RouterTotalRawBytesSensor(RouterTrafficSensorBase, SensorEntity):
     def __init__(self, coordinator: RouterTrafficSensorCoordinator, category: str, data_index: int, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass) -> None:
         """Initialize the total raw bytes sensor."""
         # Unique suffix agora inclui a categoria
-        super().__init__(coordinator, f"total_{category}_raw_{data_index}", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class)
+        super().__init__(coordinator, f"total_{category}_raw_{data_index}", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=("totals", category))
         self._category = category
         self._data_index = data_index
         # A chave para os dados brutos totais no coordenador.data
@@ -361,4 +466,34 @@ class RouterTotalRawBytesSensor(RouterTrafficSensorBase, SensorEntity):
         """Return the icon to use in the frontend."""
         if self._data_index == API_RX_BYTES_IDX:
             return "mdi:download-box"
-        return "mdi:upload-box"
\ No newline at end of file
+        return "mdi:upload-box"
+
+
+class RouterTrafficUsageSensor(RouterTrafficSensorBase, SensorEntity):
+    """Represents the traffic used in the current hour, day or month."""
+
+    def __init__(self, coordinator: RouterTrafficSensorCoordinator, cycle: str, group: str, key: str, direction: str, name: str, unit: str, device_class: SensorDeviceClass, state_class: SensorStateClass) -> None:
+        """Initialize the usage sensor."""
+        # group é "interfaces" (key = nome da interface) ou "totals" (key = ethernet, wifi, global)
+        super().__init__(coordinator, f"{group}_{key}_{direction}_{cycle}_usage", name, unit_of_measurement=unit, device_class=device_class, state_class=state_class, context=(group, key))
+        self._cycle = cycle
+        self._group = group
+        self._key = key
+        self._direction = direction
+
+    @property
+    def native_value(self):
+        """Return the bytes used in the current period."""
+        return self.coordinator.usage.get_usage(self._cycle, self._group, self._key, self._direction)
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return when the current period started."""
+        return self.coordinator.usage.get_period_start(self._cycle)
+
+    @property
+    def icon(self) -> str | None:
+        """Return the icon to use in the frontend."""
+        if self._direction == "download":
+            return "mdi:download-network"
+        return "mdi:upload-network"
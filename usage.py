@@ -0,0 +1,151 @@
+# custom_components/HA_MEO_router_traffic_monitor/usage.py
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    USAGE_CYCLE_HOURLY,
+    USAGE_CYCLE_DAILY,
+    USAGE_STORAGE_VERSION,
+    USAGE_SAVE_DELAY_SECONDS,
+)
+from .api_client import RouterApiClient, counter_delta, traffic_counters
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def period_start(cycle: str, now: datetime) -> datetime:
+    """Return the start of the hourly/daily/monthly period containing now."""
+    if cycle == USAGE_CYCLE_HOURLY:
+        return now.replace(minute=0, second=0, microsecond=0)
+    if cycle == USAGE_CYCLE_DAILY:
+        return dt_util.start_of_local_day(now)
+    return dt_util.start_of_local_day(now.replace(day=1))
+
+
+class UsageAccumulator:
+    """
+    Traffic usage per interface and per category for the configured cycles.
+
+    Usage is accumulated from the growth of the router byte counters between
+    polls and persisted with a delayed Store save, so the current period
+    survives restarts. The last counters seen are persisted with it, so the
+    traffic while HA was down is counted on the first poll after a restart,
+    and so is the client's previous sample (RouterApiClient.export_state),
+    so the first poll's speeds and gap are measured from it. Stored data looks like:
+        {"daily": {"start": "<iso>", "interfaces": {"eth0": [down, up]}, "totals": {"wifi": [down, up]}},
+         "last_counters": {"eth0": [download, upload]},
+         "client_state": {"time": "<iso>", "previous_stats": {...}}}
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, cycles: List[str], api_client: RouterApiClient) -> None:
+        """Initialize the accumulator."""
+        self._store = Store(hass, USAGE_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.usage")
+        self._api_client = api_client
+        self._cycles = cycles
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        # Last counters seen per interface, [download, upload] (see traffic_counters)
+        self._last_counters: Dict[str, List[int]] = {}
+        self._save_pending = False
+        # Bytes added by the last update per (group, key), [download, upload]
+        self._last_deltas: Dict[Tuple[str, str], List[int]] = {}
+
+    @property
+    def cycles(self) -> List[str]:
+        """Return the configured reset cycles."""
+        return self._cycles
+
+    @property
+    def last_deltas(self) -> Dict[Tuple[str, str], List[int]]:
+        """Return the bytes added by the last update per (group, key), as [download, upload]."""
+        return self._last_deltas
+
+    async def async_load(self) -> None:
+        """Restore the accumulated usage of the current periods and the client's previous sample."""
+        data = await self._store.async_load()
+        if data:
+            self._usage = {cycle: data[cycle] for cycle in self._cycles if cycle in data}
+            self._last_counters = data.get("last_counters", {})
+            self._api_client.restore_state(data.get("client_state"))
+            _LOGGER.debug("Usage restored for cycles: %s", list(self._usage))
+
+    async def async_save(self) -> None:
+        """Write the accumulated usage and the client's previous sample now (used when the entry is unloaded)."""
+        # async_save also cancels a pending delayed save
+        await self._store.async_save(self._data_to_save())
+
+    def _schedule_save(self) -> None:
+        """Schedule a delayed save, unless one is already pending."""
+        # Every async_delay_save call restarts the delay, so calling it on each
+        # poll would postpone the write for as long as HA keeps polling
+        if self._save_pending:
+            return
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_save, USAGE_SAVE_DELAY_SECONDS)
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        self._save_pending = False
+        return {**self._usage, "last_counters": self._last_counters, "client_state": self._api_client.export_state()}
+
+    def _roll_over(self, now: datetime) -> bool:
+        """Start a new period for every cycle whose period has ended. Returns True if any did."""
+        rolled_over = False
+        for cycle in self._cycles:
+            start = period_start(cycle, now).isoformat()
+            if self._usage.get(cycle, {}).get("start") != start:
+                self._usage[cycle] = {"start": start, "interfaces": {}, "totals": {}}
+                rolled_over = True
+        return rolled_over
+
+    def update(self, data: Dict[str, Any], now: datetime) -> bool:
+        """
+        Add the traffic seen since the previous poll to every cycle. Returns True if a period was reset.
+
+        After a gap (data["gap"], e.g. HA or the router restarted) a counter
+        that went down was reset rather than wrapped, so its current value is
+        the traffic since the reset.
+        """
+        rolled_over = self._roll_over(now)
+        after_gap = bool(data.get("gap"))
+        self._last_deltas = {}
+
+        for interface, values in data.get("interfaces", {}).items():
+            download_bytes, upload_bytes = traffic_counters(values.get("raw", []))
+            previous = self._last_counters.get(interface)
+            self._last_counters[interface] = [download_bytes, upload_bytes]
+            if previous is None:
+                continue
+
+            download = download_bytes if after_gap and download_bytes < previous[0] else counter_delta(download_bytes, previous[0])
+            upload = upload_bytes if after_gap and upload_bytes < previous[1] else counter_delta(upload_bytes, previous[1])
+            if not download and not upload:
+                continue
+
+            category = "wifi" if interface.startswith("wl") else "ethernet"
+            for group, key in (("interfaces", interface), ("totals", category), ("totals", "global")):
+                delta = self._last_deltas.setdefault((group, key), [0, 0])
+                delta[0] += download
+                delta[1] += upload
+                for cycle in self._cycles:
+                    usage = self._usage[cycle][group].setdefault(key, [0, 0])
+                    usage[0] += download
+                    usage[1] += upload
+
+        self._schedule_save()
+        return rolled_over
+
+    def get_usage(self, cycle: str, group: str, key: str, direction: str) -> int:
+        """Return the bytes used in the current period ("download" or "upload")."""
+        usage = self._usage.get(cycle, {}).get(group, {}).get(key, [0, 0])
+        return usage[0] if direction == "download" else usage[1]
+
+    def get_period_start(self, cycle: str) -> Optional[datetime]:
+        """Return when the current period of a cycle started."""
+        start = self._usage.get(cycle, {}).get("start")
+        return dt_util.parse_datetime(start) if start else None